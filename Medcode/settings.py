@@ -81,13 +81,17 @@ MEDIA_ROOT = BASE_DIR / "media"
 STATIC_URL = "static/"
 
 # ─── Celery ────────────────────────────────────────────────────────────────
-CELERY_BROKER_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
-CELERY_RESULT_BACKEND = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_WORKER_CONCURRENCY = 2
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_ACCEPT_CONTENT = ["json"]
 
+# ─── Document cache ─────────────────────────────────────────────────────────
+DOCUMENT_CACHE_TTL = 3600  # seconds a completed document stays in Redis
+
 # ─── Auth password validators ───────────────────────────────────────────────
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
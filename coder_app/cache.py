@@ -0,0 +1,84 @@
+import logging
+
+import brotli
+import msgpack
+import redis
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from .models import MedicalDocument
+
+logger = logging.getLogger(__name__)
+
+# First byte of every cached payload says how the rest is encoded
+_RAW = b"\x00"
+_BROTLI = b"\x01"
+COMPRESS_THRESHOLD = 1024  # bytes; smaller payloads aren't worth compressing
+
+_redis = redis.Redis.from_url(
+    settings.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+)
+
+
+def _key(doc_id) -> str:
+    return f"doc:{doc_id}"
+
+
+# ─── Write ───────────────────────────────────────────────────────────────────
+
+def cache_document(doc: MedicalDocument) -> None:
+    """
+    Store a finished document in Redis so status polls can skip Postgres.
+    Payloads are MessagePack, brotli-compressed once they pass 1KB.
+    Cache errors are logged and otherwise ignored.
+    """
+    payload = msgpack.packb({
+        "file": doc.file.name,
+        "status": doc.status,
+        "vlm_results_mp": doc.vlm_results_mp,  # already MessagePack, stored as-is
+        "error_message": doc.error_message,
+        "created_at": doc.created_at.isoformat(),
+    })
+    if len(payload) > COMPRESS_THRESHOLD:
+        payload = _BROTLI + brotli.compress(payload)
+    else:
+        payload = _RAW + payload
+
+    try:
+        _redis.setex(_key(doc.pk), settings.DOCUMENT_CACHE_TTL, payload)
+    except redis.RedisError as exc:
+        logger.warning("Could not cache document %s: %s", doc.pk, exc)
+
+
+# ─── Read ────────────────────────────────────────────────────────────────────
+
+def get_cached_document(doc_id) -> MedicalDocument | None:
+    """
+    Return an unsaved MedicalDocument rebuilt from Redis, or None on a miss.
+    An entry that can't be decoded is deleted and treated as a miss.
+    """
+    try:
+        payload = _redis.get(_key(doc_id))
+    except redis.RedisError as exc:
+        logger.warning("Could not read cached document %s: %s", doc_id, exc)
+        return None
+
+    if payload is None:
+        return None
+
+    try:
+        body = payload[1:]
+        if payload[:1] == _BROTLI:
+            body = brotli.decompress(body)
+
+        data = msgpack.unpackb(body)
+        data["created_at"] = parse_datetime(data["created_at"])
+        return MedicalDocument(pk=int(doc_id), **data)
+    except (brotli.error, ValueError, TypeError, KeyError) as exc:
+        # msgpack's decode errors (ExtraData, FormatError, ...) are ValueErrors
+        logger.warning("Dropping unreadable cached document %s: %s", doc_id, exc)
+        try:
+            _redis.delete(_key(doc_id))
+        except redis.RedisError as exc:
+            logger.warning("Could not delete cached document %s: %s", doc_id, exc)
+        return None
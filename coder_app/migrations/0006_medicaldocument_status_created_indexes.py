@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-15 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coder_app', '0005_delete_icd10code_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='medicaldocument',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='medicaldocument',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='medicaldocument',
+            index=models.Index(fields=['status', '-created_at'], name='doc_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:05
+
+import msgpack
+from django.db import migrations, models
+
+
+def pack_vlm_results(apps, schema_editor):
+    MedicalDocument = apps.get_model('coder_app', 'MedicalDocument')
+    docs = list(MedicalDocument.objects.exclude(vlm_results=None).only('vlm_results'))
+    for doc in docs:
+        doc.vlm_results_mp = msgpack.packb(doc.vlm_results)
+    MedicalDocument.objects.bulk_update(docs, ['vlm_results_mp'], batch_size=1000)
+
+
+def unpack_vlm_results(apps, schema_editor):
+    MedicalDocument = apps.get_model('coder_app', 'MedicalDocument')
+    docs = list(MedicalDocument.objects.exclude(vlm_results_mp=None).only('vlm_results_mp'))
+    for doc in docs:
+        doc.vlm_results = msgpack.unpackb(doc.vlm_results_mp)
+    MedicalDocument.objects.bulk_update(docs, ['vlm_results'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coder_app', '0006_medicaldocument_status_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicaldocument',
+            name='vlm_results_mp',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(pack_vlm_results, unpack_vlm_results),
+        migrations.RemoveField(
+            model_name='medicaldocument',
+            name='vlm_results',
+        ),
+    ]
@@ -1,3 +1,4 @@
+import msgpack
 from django.db import models
 
 
@@ -19,12 +20,28 @@ class MedicalDocument(models.Model):
         max_length=20,
         choices=STATUS_CHOICES,
         default=STATUS_PENDING,
-        db_index=True,
     )
-    vlm_results = models.JSONField(null=True, blank=True)
-    # e.g. [{"code": "J18.9", "description": "Pneumonia, unspecified organism"}, ...]
+    vlm_results_mp = models.BinaryField(null=True, blank=True)
+    # MessagePack-encoded; read and write it through the vlm_results property
     error_message = models.TextField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Status polls filter on status and list newest first
+            models.Index(fields=["status", "-created_at"], name="doc_status_created_idx"),
+        ]
+
+    @property
+    def vlm_results(self):
+        # e.g. [{"code": "J18.9", "description": "Pneumonia, unspecified organism"}, ...]
+        if self.vlm_results_mp is None:
+            return None
+        return msgpack.unpackb(self.vlm_results_mp)
+
+    @vlm_results.setter
+    def vlm_results(self, value):
+        self.vlm_results_mp = None if value is None else msgpack.packb(value)
 
     def __str__(self):
         return f"Document {self.id} [{self.status}]"
@@ -1,48 +1,223 @@
-import base64
 import io
-import json
-import re
+import mmap
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+import orjson
+import pybase64
 import requests
+from celery.signals import worker_process_init
 from django.conf import settings
-from PIL import Image
+from PIL import Image, ImageFile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# ─── Errors ──────────────────────────────────────────────────────────────────
+
+class VLMRateLimited(RuntimeError):
+    """
+    OpenRouter answered 429.
+    retry_after is how many seconds it asked us to wait before trying again.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_after(response, default: int = 10) -> int:
+    """Read Retry-After as seconds; the HTTP-date form falls back to the default."""
+    try:
+        return max(0, int(response.headers.get("Retry-After", default)))
+    except ValueError:
+        return default
+
+
+# ─── HTTP Session ────────────────────────────────────────────────────────────
+
+_session = None
+_session_cold = False  # set when a new session has not been warmed up yet
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """
+    Return the process-wide OpenRouter session, creating it on first use.
+    Reusing it keeps the TCP+TLS connection alive between VLM calls.
+    """
+    global _session, _session_cold
+    if _session is not None:
+        return _session
+
+    with _session_lock:
+        if _session is not None:
+            return _session  # another thread built it while we waited
+
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            # Retry connect failures and gateway errors; 429 is left to the Celery task.
+            # read=False: a POST that timed out may already be running (and billed) upstream.
+            # Provider-requested waits belong in a Celery countdown, not a sleep on this thread.
+            max_retries=Retry(
+                total=3,
+                connect=3,
+                read=False,
+                status=3,
+                other=0,
+                backoff_factor=0.5,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False,
+                respect_retry_after_header=False,
+            ),
+        ))
+        session.headers.update({
+            "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+            "Accept-Encoding": "br, gzip",  # urllib3 decodes br via the brotli package
+        })
+        _session = session
+        _session_cold = True
+        return session
+
+
+def _claim_warm_up() -> bool:
+    """Return True to exactly one caller after a new session has been created."""
+    global _session_cold
+    with _session_lock:
+        cold, _session_cold = _session_cold, False
+    return cold
+
+
+@worker_process_init.connect
+def _reset_session(**kwargs):
+    """Drop any session inherited from the parent so each forked worker opens its own sockets."""
+    global _session, _session_cold, _session_lock
+    _session = None
+    _session_cold = False
+    _session_lock = threading.Lock()  # a lock copied mid-acquire would never release
+
+
+def _warm_up(session: requests.Session) -> None:
+    """Open the TLS connection to OpenRouter ahead of the real request."""
+    try:
+        session.head(settings.OPENROUTER_API_URL, timeout=5)
+    except requests.RequestException:
+        pass  # the real request will surface any connection problem
 
 
 # ─── Image Preprocessing ────────────────────────────────────────────────────
 
+# Decode what we can of a cut-off upload rather than failing the whole document
+ImageFile.LOAD_TRUNCATED_IMAGES = True
+
+_encode_buffers = threading.local()
+
+# Pillow releases the GIL while decoding, resizing and encoding
+_preproc_pool = ThreadPoolExecutor(max_workers=2)
+
+
+@worker_process_init.connect
+def _reset_preproc_pool(**kwargs):
+    """Give each forked worker its own threads instead of the parent's pool."""
+    global _preproc_pool
+    _preproc_pool = ThreadPoolExecutor(max_workers=2)
+
+
+def _encode_buffer() -> io.BytesIO:
+    """Return this thread's reusable JPEG output buffer, rewound to the start."""
+    buf = getattr(_encode_buffers, "buf", None)
+    if buf is None:
+        buf = _encode_buffers.buf = io.BytesIO()
+    buf.seek(0)
+    return buf
+
+
 def preprocess_image(image_path: str) -> tuple[bytes, str]:
     """
     Resize image to max 2MP and compress to JPEG at 85% quality.
     Returns (bytes, mime_type).
     Keeps payload small while preserving enough detail for the VLM.
+    Small JPEGs that already fit and carry no metadata are passed through untouched.
     """
     MAX_PIXELS = 2_000_000  # 2 megapixels
+    MAX_PASSTHROUGH_BYTES = 500_000  # already-compressed JPEGs below this skip re-encoding
+    METADATA_MARKERS = ("APP1", "APP13", "COM")  # EXIF/XMP, IPTC, comments
 
-    with Image.open(image_path) as img:
-        img = img.convert("RGB")  # strip alpha, ensure JPEG-compatible
-
+    # Map the upload instead of copying it through Python-side read buffers
+    with (
+        open(image_path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+        Image.open(mm) as img,
+    ):
         w, h = img.size
+        if (
+            img.format == "JPEG"
+            and img.mode in ("RGB", "L")
+            and w * h <= MAX_PIXELS
+            and len(mm) <= MAX_PASSTHROUGH_BYTES
+            # A cut-off upload has no end-of-image marker; decode what we can instead
+            and mm[-2:] == b"\xff\xd9"
+            # Never forward camera/GPS metadata; re-encoding strips it
+            and not any(marker in METADATA_MARKERS for marker, _ in img.applist)
+        ):
+            return mm[:], "image/jpeg"
+
         if w * h > MAX_PIXELS:
             scale = (MAX_PIXELS / (w * h)) ** 0.5
-            img = img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
+            target = (int(w * scale), int(h * scale))
+            # JPEGs: libjpeg scales by 1/2, 1/4 or 1/8 in the DCT domain while decoding
+            img.draft("RGB", target)
+            # Pillow resamples bilevel ("1") and palette ("P") images with NEAREST,
+            # so bring everything but RGB/L to RGB before filtering
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            # Box-reduce to within 3x of target, then LANCZOS the rest of the way
+            img.thumbnail(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
 
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=85, optimize=True)
-        return buf.getvalue(), "image/jpeg"
+        if img.mode != "RGB":
+            img = img.convert("RGB")  # strip alpha, ensure JPEG-compatible
+
+        # The buffer is reused, so only the bytes written this call are returned
+        buf = _encode_buffer()
+        # Transient payload: skip the optimal-Huffman pass, use 4:2:0 chroma
+        img.save(
+            buf, format="JPEG", quality=85, optimize=False, progressive=False, subsampling=2
+        )
+        with buf.getbuffer() as view:
+            return bytes(view[:buf.tell()]), "image/jpeg"
 
 
 # ─── VLM Call ────────────────────────────────────────────────────────────────
 
+def _strip_fences(content: str) -> str:
+    """Remove a ```json ... ``` wrapper the model sometimes adds around its answer."""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content[3:].removeprefix("json")
+    if content.endswith("```"):
+        content = content[:-3]
+    return content.strip()
+
+
 def call_vlm(image_path: str) -> list[dict]:
     """
     Send a medical document image to Qwen 2.5 VL via OpenRouter.
     Returns a list of ICD-10 code dicts:
         [{"code": "J18.9", "description": "Pneumonia, unspecified organism"}, ...]
-    Raises RuntimeError on failure.
+    Raises RuntimeError on failure (VLMRateLimited when throttled).
     """
-    # 1. Preprocess: resize to 2MP max, compress to JPEG
-    image_bytes, mime = preprocess_image(image_path)
-    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+    # 1. Preprocess: resize to 2MP max, compress to JPEG.
+    #    Runs on a pool thread so a cold session can connect in the meantime.
+    future = _preproc_pool.submit(preprocess_image, image_path)
+    session = _get_session()
+    if _claim_warm_up():
+        _warm_up(session)
+    image_bytes, mime = future.result()
+    image_b64 = pybase64.b64encode(image_bytes).decode("ascii")
 
     # 2. Build prompt
     prompt = (
@@ -54,13 +229,9 @@ def call_vlm(image_path: str) -> list[dict]:
     )
 
     # 3. Call OpenRouter
-    response = requests.post(
+    response = session.post(
         settings.OPENROUTER_API_URL,
-        headers={
-            "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-        },
-        json={
+        data=orjson.dumps({
             "model": settings.OPENROUTER_MODEL,
             "messages": [
                 {
@@ -74,24 +245,30 @@ def call_vlm(image_path: str) -> list[dict]:
                     ],
                 }
             ],
-        },
+        }),
         timeout=60,
     )
 
+    if response.status_code == 429:
+        raise VLMRateLimited(
+            f"OpenRouter error 429: {response.text[:300]}",
+            retry_after=_retry_after(response),
+        )
+
     if not response.ok:
         raise RuntimeError(
             f"OpenRouter error {response.status_code}: {response.text[:300]}"
         )
 
     # 4. Extract and parse JSON from model output
-    content = response.json()["choices"][0]["message"]["content"]
+    content = orjson.loads(response.content)["choices"][0]["message"]["content"]
 
     # Strip any accidental markdown fences the model might add
-    content = re.sub(r"```(?:json)?", "", content).strip().rstrip("`").strip()
+    content = _strip_fences(content)
 
     try:
-        results = json.loads(content)
-    except json.JSONDecodeError as exc:
+        results = orjson.loads(content)
+    except orjson.JSONDecodeError as exc:
         raise RuntimeError(f"VLM returned non-JSON content: {content[:200]}") from exc
 
     if not isinstance(results, list):
@@ -1,6 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from celery import shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from .cache import cache_document
 from .models import MedicalDocument
-from .services import call_vlm
+from .services import VLMRateLimited, call_vlm
+
+BATCH_MAX_WORKERS = 8  # concurrent VLM calls per batch task
+RETRY_BACKOFF_MAX = 600  # seconds
 
 
 @shared_task(bind=True, max_retries=2, default_retry_delay=10)
@@ -9,22 +16,89 @@ def process_document(self, doc_id: int):
     Background task: call the VLM and store results on the MedicalDocument.
     """
     try:
-        doc = MedicalDocument.objects.get(pk=doc_id)
+        doc = MedicalDocument.objects.only("file", "created_at").get(pk=doc_id)
     except MedicalDocument.DoesNotExist:
         return  # Nothing to do
 
-    doc.status = MedicalDocument.STATUS_PROCESSING
-    doc.save(update_fields=["status"])
+    documents = MedicalDocument.objects.filter(pk=doc_id)
+    documents.update(status=MedicalDocument.STATUS_PROCESSING)
 
     try:
         results = call_vlm(doc.file.path)
         doc.vlm_results = results
         doc.status = MedicalDocument.STATUS_COMPLETED
         doc.error_message = None
-        doc.save(update_fields=["vlm_results", "status", "error_message"])
+        documents.update(
+            vlm_results_mp=doc.vlm_results_mp,
+            status=doc.status,
+            error_message=None,
+        )
+        cache_document(doc)
 
     except Exception as exc:
-        doc.status = MedicalDocument.STATUS_FAILED
-        doc.error_message = str(exc)
-        doc.save(update_fields=["status", "error_message"])
-        raise self.retry(exc=exc)
+        documents.update(status=MedicalDocument.STATUS_FAILED, error_message=str(exc))
+
+        if isinstance(exc, VLMRateLimited):
+            countdown = exc.retry_after  # wait as long as OpenRouter asked
+        else:
+            countdown = get_exponential_backoff_interval(
+                factor=self.default_retry_delay,
+                retries=self.request.retries,
+                maximum=RETRY_BACKOFF_MAX,
+                full_jitter=True,
+            )
+        raise self.retry(exc=exc, countdown=countdown)
+
+
+@shared_task
+def process_documents_batch(doc_ids: list[int]):
+    """
+    Background task: run several uploaded documents through the VLM at once.
+    Calls share the worker's pooled HTTP session; results are written back
+    in a single bulk update. Failed documents are handed to process_document
+    so they get the same retry handling as single uploads.
+    """
+    docs = list(MedicalDocument.objects.filter(pk__in=doc_ids).only("file", "created_at"))
+    if not docs:
+        return  # Nothing to do
+
+    MedicalDocument.objects.filter(pk__in=[doc.pk for doc in docs]).update(
+        status=MedicalDocument.STATUS_PROCESSING
+    )
+
+    retries = []  # (doc_id, countdown) for documents to hand back to process_document
+
+    with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(docs))) as pool:
+        futures = [(doc, pool.submit(call_vlm, doc.file.path)) for doc in docs]
+
+        for doc, future in futures:
+            try:
+                doc.vlm_results = future.result()
+                doc.status = MedicalDocument.STATUS_COMPLETED
+                doc.error_message = None
+            except Exception as exc:
+                doc.vlm_results = None
+                doc.status = MedicalDocument.STATUS_FAILED
+                doc.error_message = str(exc)
+                if isinstance(exc, VLMRateLimited):
+                    countdown = exc.retry_after
+                else:
+                    # Same first-retry backoff process_document would have applied
+                    countdown = get_exponential_backoff_interval(
+                        factor=process_document.default_retry_delay,
+                        retries=0,
+                        maximum=RETRY_BACKOFF_MAX,
+                        full_jitter=True,
+                    )
+                retries.append((doc.pk, countdown))
+
+    MedicalDocument.objects.bulk_update(docs, ["vlm_results_mp", "status", "error_message"])
+
+    # Dispatch only after the bulk update so it can't overwrite the retry's status.
+    # retries=1 counts the batch call as the first attempt, as for single uploads.
+    for doc_id, countdown in retries:
+        process_document.apply_async((doc_id,), countdown=countdown, retries=1)
+
+    for doc in docs:
+        if doc.status == MedicalDocument.STATUS_COMPLETED:
+            cache_document(doc)
@@ -6,15 +6,23 @@ Run with:
 """
 import io
 import json
+import os
+import tempfile
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
+import msgpack
+import requests
+from celery.exceptions import Retry
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.urls import reverse
 
 from .models import MedicalDocument
-from .services import call_vlm
-from .tasks import process_document
+from . import cache, services
+from .services import VLMRateLimited, call_vlm, preprocess_image
+from .tasks import process_document, process_documents_batch
 
 
 # ─── Helpers ────────────────────────────────────────────────────────────────
@@ -32,6 +40,33 @@ def _uploaded_image(name="test.jpg"):
     return SimpleUploadedFile(name, _fake_image(), content_type="image/jpeg")
 
 
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+class IsolatedCacheTestCase(TestCase):
+    """
+    Every test gets a fresh in-memory Redis, so the suite never reads or
+    writes the real cache (which shares the Celery broker DB).
+    """
+    def setUp(self):
+        super().setUp()
+        self.redis = FakeRedis()
+        patcher = patch("coder_app.cache._redis", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
 # ─── Model Tests ─────────────────────────────────────────────────────────────
 
 class MedicalDocumentModelTest(TestCase):
@@ -55,10 +90,20 @@ class MedicalDocumentModelTest(TestCase):
         self.assertIsNone(doc.vlm_results)
         self.assertIsNone(doc.error_message)
 
+    def test_vlm_results_stored_as_msgpack(self):
+        doc = MedicalDocument.objects.create(file=_uploaded_image())
+        icd_codes = [{"code": "J18.9", "description": "Pneumonia"}]
+        doc.vlm_results = icd_codes
+        doc.save()
+
+        doc.refresh_from_db()
+        self.assertEqual(bytes(doc.vlm_results_mp), msgpack.packb(icd_codes))
+        self.assertEqual(doc.vlm_results, icd_codes)
+
 
 # ─── View Tests ──────────────────────────────────────────────────────────────
 
-class UploadDocumentViewTest(TestCase):
+class UploadDocumentViewTest(IsolatedCacheTestCase):
     @patch("coder_app.views.process_document")
     def test_upload_returns_202(self, mock_task):
         """POST /api/upload/ should return 202 Accepted."""
@@ -92,7 +137,7 @@ class UploadDocumentViewTest(TestCase):
         self.assertEqual(response.status_code, 400)
 
 
-class DocumentStatusViewTest(TestCase):
+class DocumentStatusViewTest(IsolatedCacheTestCase):
     def _create_completed_doc(self):
         doc = MedicalDocument.objects.create(file=_uploaded_image())
         doc.status = MedicalDocument.STATUS_COMPLETED
@@ -117,6 +162,76 @@ class DocumentStatusViewTest(TestCase):
         self.assertEqual(data["vlm_results"][0]["code"], "J18.9")
 
 
+# ─── Cache Tests ─────────────────────────────────────────────────────────────
+
+class DocumentCacheTest(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doc = MedicalDocument.objects.create(file=_uploaded_image())
+        self.doc.status = MedicalDocument.STATUS_COMPLETED
+        self.doc.vlm_results = [{"code": "J18.9", "description": "Pneumonia"}]
+        self.doc.save()
+
+    def test_round_trip(self):
+        """A cached document should come back with the same fields."""
+        cache.cache_document(self.doc)
+        cached = cache.get_cached_document(self.doc.id)
+        self.assertEqual(cached.pk, self.doc.pk)
+        self.assertEqual(cached.file.name, self.doc.file.name)
+        self.assertEqual(cached.status, self.doc.status)
+        self.assertEqual(cached.vlm_results, self.doc.vlm_results)
+        self.assertEqual(cached.created_at, self.doc.created_at)
+
+    def test_large_payload_is_compressed(self):
+        """Payloads over the threshold should be brotli-compressed."""
+        self.doc.vlm_results = [
+            {"code": f"Z{i:02d}.0", "description": "Encounter for general exam"}
+            for i in range(100)
+        ]
+        cache.cache_document(self.doc)
+        self.assertEqual(self.redis.store[f"doc:{self.doc.id}"][:1], b"\x01")
+        self.assertEqual(
+            cache.get_cached_document(self.doc.id).vlm_results, self.doc.vlm_results
+        )
+
+    def test_miss_returns_none(self):
+        self.assertIsNone(cache.get_cached_document(self.doc.id))
+
+    def test_unreadable_entry_is_dropped(self):
+        """Corrupt entries should read as a miss and be removed from Redis."""
+        key = f"doc:{self.doc.id}"
+        good = msgpack.packb({"file": "a.jpg"})
+        for payload in (
+            b"\x01not brotli",          # bad compression
+            b"\x00" + good[:-2],        # truncated MessagePack
+            b"\x00" + good + b"\x00",  # trailing bytes
+            b"\x00" + good,             # missing fields
+        ):
+            self.redis.store[key] = payload
+            self.assertIsNone(cache.get_cached_document(self.doc.id))
+            self.assertNotIn(key, self.redis.store)
+
+    def test_status_view_falls_back_on_unreadable_entry(self):
+        """GET /api/documents/<id>/ should answer from the DB when the cache entry is bad."""
+        self.redis.store[f"doc:{self.doc.id}"] = b"\x01not brotli"
+        response = self.client.get(f"/api/documents/{self.doc.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["vlm_results"][0]["code"], "J18.9")
+
+    def test_status_view_serves_cached_document(self):
+        """GET /api/documents/<id>/ should answer from Redis without touching the DB."""
+        cache.cache_document(self.doc)
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/api/documents/{self.doc.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["vlm_results"][0]["code"], "J18.9")
+
+    def test_status_view_caches_completed_document(self):
+        """A DB hit on a completed document should populate the cache."""
+        self.client.get(f"/api/documents/{self.doc.id}/")
+        self.assertIn(f"doc:{self.doc.id}", self.redis.store)
+
+
 # ─── Service Tests ────────────────────────────────────────────────────────────
 
 class CallVLMServiceTest(TestCase):
@@ -125,75 +240,342 @@ class CallVLMServiceTest(TestCase):
         mock_resp.ok = status_code == 200
         mock_resp.status_code = status_code
         mock_resp.text = content
-        mock_resp.json.return_value = {
+        mock_resp.content = json.dumps({
             "choices": [{"message": {"content": content}}]
-        }
+        }).encode()
         return mock_resp
 
-    @patch("coder_app.services.requests.post")
+    @patch("coder_app.services._get_session")
     @patch("coder_app.services.preprocess_image")
-    def test_valid_json_response(self, mock_preprocess, mock_post):
+    def test_valid_json_response(self, mock_preprocess, mock_session):
         """call_vlm should return parsed list on valid JSON response."""
         mock_preprocess.return_value = (b"fakejpeg", "image/jpeg")
         expected = [{"code": "J18.9", "description": "Pneumonia"}]
-        mock_post.return_value = self._mock_response(json.dumps(expected))
+        mock_session.return_value.post.return_value = self._mock_response(json.dumps(expected))
 
         result = call_vlm("/fake/path.jpg")
         self.assertEqual(result, expected)
 
-    @patch("coder_app.services.requests.post")
+    @patch("coder_app.services._get_session")
     @patch("coder_app.services.preprocess_image")
-    def test_strips_markdown_fences(self, mock_preprocess, mock_post):
+    def test_strips_markdown_fences(self, mock_preprocess, mock_session):
         """call_vlm should strip ```json ... ``` wrappers from response."""
         mock_preprocess.return_value = (b"fakejpeg", "image/jpeg")
         fenced = '```json\n[{"code": "Z00.0", "description": "Encounter for general exam"}]\n```'
-        mock_post.return_value = self._mock_response(fenced)
+        mock_session.return_value.post.return_value = self._mock_response(fenced)
 
         result = call_vlm("/fake/path.jpg")
         self.assertEqual(result[0]["code"], "Z00.0")
 
-    @patch("coder_app.services.requests.post")
+    @patch("coder_app.services._get_session")
     @patch("coder_app.services.preprocess_image")
-    def test_invalid_json_raises_runtime_error(self, mock_preprocess, mock_post):
+    def test_strips_bare_markdown_fences(self, mock_preprocess, mock_session):
+        """call_vlm should strip ``` ... ``` wrappers without a language tag."""
+        mock_preprocess.return_value = (b"fakejpeg", "image/jpeg")
+        fenced = '```\n[{"code": "R05", "description": "Cough"}]\n```'
+        mock_session.return_value.post.return_value = self._mock_response(fenced)
+
+        result = call_vlm("/fake/path.jpg")
+        self.assertEqual(result[0]["code"], "R05")
+
+    @patch("coder_app.services._get_session")
+    @patch("coder_app.services.preprocess_image")
+    def test_invalid_json_raises_runtime_error(self, mock_preprocess, mock_session):
         """call_vlm should raise RuntimeError when model returns non-JSON."""
         mock_preprocess.return_value = (b"fakejpeg", "image/jpeg")
-        mock_post.return_value = self._mock_response("Sorry, I cannot process this.")
+        mock_session.return_value.post.return_value = self._mock_response("Sorry, I cannot process this.")
 
         with self.assertRaises(RuntimeError) as ctx:
             call_vlm("/fake/path.jpg")
         self.assertIn("non-JSON", str(ctx.exception))
 
-    @patch("coder_app.services.requests.post")
+    @patch("coder_app.services._get_session")
     @patch("coder_app.services.preprocess_image")
-    def test_api_error_raises_runtime_error(self, mock_preprocess, mock_post):
+    def test_api_error_raises_runtime_error(self, mock_preprocess, mock_session):
         """call_vlm should raise RuntimeError on non-200 API response."""
         mock_preprocess.return_value = (b"fakejpeg", "image/jpeg")
         bad_resp = MagicMock()
         bad_resp.ok = False
         bad_resp.status_code = 429
         bad_resp.text = "Rate limit exceeded"
-        mock_post.return_value = bad_resp
+        bad_resp.headers = {}
+        mock_session.return_value.post.return_value = bad_resp
 
         with self.assertRaises(RuntimeError) as ctx:
             call_vlm("/fake/path.jpg")
         self.assertIn("429", str(ctx.exception))
 
-    @patch("coder_app.services.requests.post")
+    @patch("coder_app.services._get_session")
+    @patch("coder_app.services.preprocess_image")
+    def test_rate_limit_carries_retry_after(self, mock_preprocess, mock_session):
+        """call_vlm should raise VLMRateLimited with the server's Retry-After."""
+        mock_preprocess.return_value = (b"fakejpeg", "image/jpeg")
+        bad_resp = MagicMock()
+        bad_resp.ok = False
+        bad_resp.status_code = 429
+        bad_resp.text = "Rate limit exceeded"
+        bad_resp.headers = {"Retry-After": "30"}
+        mock_session.return_value.post.return_value = bad_resp
+
+        with self.assertRaises(VLMRateLimited) as ctx:
+            call_vlm("/fake/path.jpg")
+        self.assertEqual(ctx.exception.retry_after, 30)
+
+    @patch("coder_app.services._get_session")
     @patch("coder_app.services.preprocess_image")
-    def test_non_list_response_raises_runtime_error(self, mock_preprocess, mock_post):
+    def test_non_list_response_raises_runtime_error(self, mock_preprocess, mock_session):
         """call_vlm should raise RuntimeError if JSON root is not a list."""
         mock_preprocess.return_value = (b"fakejpeg", "image/jpeg")
-        mock_post.return_value = self._mock_response('{"code": "J18.9"}')
+        mock_session.return_value.post.return_value = self._mock_response('{"code": "J18.9"}')
 
         with self.assertRaises(RuntimeError) as ctx:
             call_vlm("/fake/path.jpg")
         self.assertIn("Expected a JSON array", str(ctx.exception))
 
 
+class PreprocessImageTest(TestCase):
+    def _write_image(self, size, mode="RGB", fmt="JPEG"):
+        from PIL import Image
+        tmp = tempfile.NamedTemporaryFile(suffix=f".{fmt.lower()}", delete=False)
+        self.addCleanup(os.remove, tmp.name)
+        Image.new(mode, size, color=(200, 100, 50, 255)[:len(mode)]).save(tmp, format=fmt)
+        tmp.close()
+        return tmp.name
+
+    def test_large_image_downscaled_to_2mp(self):
+        """preprocess_image should shrink images above 2MP."""
+        from PIL import Image
+        data, mime = preprocess_image(self._write_image((3000, 2000)))
+        self.assertEqual(mime, "image/jpeg")
+        with Image.open(io.BytesIO(data)) as img:
+            self.assertLessEqual(img.size[0] * img.size[1], 2_000_000)
+
+    def test_truncated_jpeg_still_decodes(self):
+        """preprocess_image should decode what it can of a truncated upload."""
+        from PIL import Image
+        path = self._write_image((3000, 2000))
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+        data, mime = preprocess_image(path)
+        self.assertEqual(mime, "image/jpeg")
+        self.assertTrue(data.endswith(b"\xff\xd9"))  # JPEG end-of-image marker
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            self.assertLessEqual(img.size[0] * img.size[1], 2_000_000)
+
+    def test_small_jpeg_passed_through_unchanged(self):
+        """preprocess_image should return a small JPEG's original bytes."""
+        path = self._write_image((640, 480))
+        with open(path, "rb") as f:
+            original = f.read()
+        self.assertEqual(preprocess_image(path), (original, "image/jpeg"))
+
+    def test_small_truncated_jpeg_is_reencoded(self):
+        """A cut-off small JPEG should be decoded and re-encoded, not forwarded as-is."""
+        from PIL import Image
+        path = self._write_image((800, 600))
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+        with open(path, "rb") as f:
+            truncated = f.read()
+
+        data, mime = preprocess_image(path)
+        self.assertEqual(mime, "image/jpeg")
+        self.assertNotEqual(data, truncated)
+        self.assertTrue(data.endswith(b"\xff\xd9"))  # JPEG end-of-image marker
+        with Image.open(io.BytesIO(data)) as img:
+            self.assertEqual(img.size, (800, 600))
+
+    def test_small_jpeg_with_exif_is_stripped(self):
+        """preprocess_image should re-encode small JPEGs rather than forward their EXIF."""
+        from PIL import Image
+        exif = Image.Exif()
+        exif[0x010F] = "ACME Camera"  # Make
+        tmp = tempfile.NamedTemporaryFile(suffix=".jpg", delete=False)
+        self.addCleanup(os.remove, tmp.name)
+        Image.new("RGB", (640, 480), color=(200, 100, 50)).save(
+            tmp, format="JPEG", exif=exif.tobytes()
+        )
+        tmp.close()
+
+        data, mime = preprocess_image(tmp.name)
+        self.assertEqual(mime, "image/jpeg")
+        self.assertNotIn(b"ACME Camera", data)
+        with Image.open(io.BytesIO(data)) as img:
+            self.assertNotIn("exif", img.info)
+
+    def test_small_png_is_reencoded(self):
+        """preprocess_image should still convert non-JPEG input to JPEG."""
+        path = self._write_image((64, 64), fmt="PNG")
+        data, mime = preprocess_image(path)
+        self.assertEqual(mime, "image/jpeg")
+        self.assertTrue(data.startswith(b"\xff\xd8"))  # JPEG start-of-image marker
+
+    def test_reused_buffer_does_not_leak_previous_output(self):
+        """A small image encoded after a large one must not carry stale bytes."""
+        from PIL import Image
+        preprocess_image(self._write_image((3000, 2000)))
+        data, _ = preprocess_image(self._write_image((10, 10), mode="RGBA", fmt="PNG"))
+        self.assertTrue(data.endswith(b"\xff\xd9"))  # JPEG end-of-image marker
+        with Image.open(io.BytesIO(data)) as img:
+            self.assertEqual(img.size, (10, 10))
+
+    def test_large_bilevel_scan_is_filtered_not_nearest(self):
+        """A large mode-"1" scan should be LANCZOS-filtered, matching convert-then-resize."""
+        from PIL import Image, ImageStat
+        # 1px alternating strokes: filtering averages them to grey, NEAREST keeps them black/white
+        scan = Image.frombytes("1", (4000, 3000), bytes([0b10101010]) * (4000 // 8 * 3000))
+        tmp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
+        self.addCleanup(os.remove, tmp.name)
+        scan.save(tmp, format="PNG")
+        tmp.close()
+
+        data, _ = preprocess_image(tmp.name)
+        with Image.open(io.BytesIO(data)) as img:
+            result_std = ImageStat.Stat(img.convert("L")).stddev[0]
+            reference = scan.convert("RGB").resize(img.size, Image.Resampling.LANCZOS)
+        reference_std = ImageStat.Stat(reference.convert("L")).stddev[0]
+        self.assertAlmostEqual(result_std, reference_std, delta=10)
+
+    def test_alpha_image_converted_to_rgb(self):
+        """preprocess_image should strip alpha so the result is JPEG-compatible."""
+        from PIL import Image
+        data, _ = preprocess_image(self._write_image((10, 10), mode="RGBA", fmt="PNG"))
+        with Image.open(io.BytesIO(data)) as img:
+            self.assertEqual(img.mode, "RGB")
+
+
+class HTTPSessionTest(TestCase):
+    def setUp(self):
+        services._reset_session()
+        self.addCleanup(services._reset_session)
+
+    def test_session_is_reused(self):
+        """_get_session should hand back the same pooled session every call."""
+        self.assertIs(services._get_session(), services._get_session())
+
+    def test_concurrent_first_use_builds_one_session(self):
+        """Threads racing on a cold worker should share one session and warm it once."""
+        def slow_session():
+            time.sleep(0.05)  # widen the race window
+            return MagicMock()
+
+        barrier = threading.Barrier(8)
+        sessions, claims = [], []
+
+        def worker():
+            barrier.wait()
+            sessions.append(services._get_session())
+            claims.append(services._claim_warm_up())
+
+        with patch("coder_app.services.requests.Session", side_effect=slow_session) as mock_cls:
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(mock_cls.call_count, 1)
+        self.assertEqual(len({id(s) for s in sessions}), 1)
+        self.assertEqual(claims.count(True), 1)
+
+    def test_session_retries_gateway_errors(self):
+        """The HTTPS adapter should retry 502/503/504 on POST."""
+        retries = services._get_session().get_adapter("https://openrouter.ai").max_retries
+        self.assertEqual(retries.total, 3)
+        self.assertIn(503, retries.status_forcelist)
+        self.assertIn("POST", retries.allowed_methods)
+
+    @patch("coder_app.services.preprocess_image")
+    def test_cold_session_is_warmed_up(self, mock_preprocess):
+        """call_vlm should prime a freshly created session before posting."""
+        mock_preprocess.return_value = (b"fakejpeg", "image/jpeg")
+        session = MagicMock()
+        session.post.return_value.ok = True
+        session.post.return_value.status_code = 200
+        session.post.return_value.content = json.dumps(
+            {"choices": [{"message": {"content": "[]"}}]}
+        ).encode()
+
+        with patch("coder_app.services.requests.Session", return_value=session):
+            self.assertEqual(call_vlm("/fake/path.jpg"), [])
+            session.head.assert_called_once()
+
+            call_vlm("/fake/path.jpg")
+            session.head.assert_called_once()  # warm session is not primed again
+
+    def _serve(self, handle_post):
+        """
+        Run a local HTTP server whose POST handler is handle_post(handler).
+        Returns (session, url); the session uses the production adapter over plain HTTP.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                handle_post(self)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        session = services._get_session()
+        session.mount("http://", session.get_adapter("https://openrouter.ai"))
+        return session, f"http://127.0.0.1:{server.server_port}/"
+
+    def test_read_timeout_is_not_retried(self):
+        """A slow VLM reply must not be resent: one POST, then ReadTimeout."""
+        hits = []
+
+        def slow(handler):
+            hits.append(handler.path)
+            time.sleep(0.5)
+
+        session, url = self._serve(slow)
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            session.post(url, data=b"{}", timeout=0.1)
+        self.assertEqual(len(hits), 1)
+
+    def test_gateway_retry_ignores_retry_after(self):
+        """A 503 with Retry-After must be retried promptly, not slept on in the worker."""
+        hits = []
+
+        def unavailable_then_ok(handler):
+            hits.append(handler.path)
+            status = 503 if len(hits) == 1 else 200
+            handler.send_response(status)
+            handler.send_header("Retry-After", "30")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+
+        session, url = self._serve(unavailable_then_ok)
+        started = time.monotonic()
+        response = session.post(url, data=b"{}", timeout=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(hits), 2)
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_session_requests_compressed_responses(self):
+        """The session should advertise brotli and gzip response encodings."""
+        self.assertIn("br", services._get_session().headers["Accept-Encoding"])
+
+    def test_reset_session_forces_new_session(self):
+        """worker_process_init should give each forked worker a fresh session."""
+        first = services._get_session()
+        services._reset_session()
+        self.assertIsNot(first, services._get_session())
+
+
 # ─── Task Tests ───────────────────────────────────────────────────────────────
 
-class ProcessDocumentTaskTest(TestCase):
+class ProcessDocumentTaskTest(IsolatedCacheTestCase):
     def setUp(self):
+        super().setUp()
         self.doc = MedicalDocument.objects.create(file=_uploaded_image())
 
     @patch("coder_app.tasks.call_vlm")
@@ -224,7 +606,77 @@ class ProcessDocumentTaskTest(TestCase):
         self.assertEqual(self.doc.status, MedicalDocument.STATUS_FAILED)
         self.assertIn("VLM timeout", self.doc.error_message)
 
+    @patch("coder_app.tasks.call_vlm")
+    def test_task_retries_after_rate_limit_delay(self, mock_vlm):
+        """process_document should wait out Retry-After before retrying a 429."""
+        mock_vlm.side_effect = VLMRateLimited("OpenRouter error 429", retry_after=42)
+
+        with patch.object(process_document, "retry", side_effect=Retry()) as mock_retry:
+            with self.assertRaises(Retry):
+                process_document(self.doc.id)
+
+        self.assertEqual(mock_retry.call_args.kwargs["countdown"], 42)
+
     def test_task_noop_for_nonexistent_doc(self):
         """process_document should silently return if doc ID doesn't exist."""
         # Should not raise
         process_document(99999)
+
+
+class ProcessDocumentsBatchTaskTest(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ok_doc = MedicalDocument.objects.create(file=_uploaded_image("ok.jpg"))
+        self.bad_doc = MedicalDocument.objects.create(file=_uploaded_image("bad.jpg"))
+
+    @patch("coder_app.tasks.process_document.apply_async")
+    @patch("coder_app.tasks.call_vlm")
+    def test_batch_stores_results_per_document(self, mock_vlm, mock_dispatch):
+        """process_documents_batch should complete or fail each document independently."""
+        icd_codes = [{"code": "J18.9", "description": "Pneumonia"}]
+        bad_path = self.bad_doc.file.path
+
+        def fake_vlm(path):
+            if path == bad_path:
+                raise RuntimeError("VLM timeout")
+            return icd_codes
+
+        mock_vlm.side_effect = fake_vlm
+
+        process_documents_batch([self.ok_doc.id, self.bad_doc.id])
+
+        self.ok_doc.refresh_from_db()
+        self.bad_doc.refresh_from_db()
+        self.assertEqual(self.ok_doc.status, MedicalDocument.STATUS_COMPLETED)
+        self.assertEqual(self.ok_doc.vlm_results, icd_codes)
+        self.assertEqual(self.bad_doc.status, MedicalDocument.STATUS_FAILED)
+        self.assertIn("VLM timeout", self.bad_doc.error_message)
+        mock_dispatch.assert_called_once()
+        args, kwargs = mock_dispatch.call_args
+        self.assertEqual(args, ((self.bad_doc.id,),))
+        self.assertEqual(kwargs["retries"], 1)  # batch call was the first attempt
+        # Backed off like process_document's first retry, not re-run immediately
+        self.assertLessEqual(kwargs["countdown"], process_document.default_retry_delay)
+
+    @patch("coder_app.tasks.process_document.apply_async")
+    @patch("coder_app.tasks.call_vlm")
+    def test_batch_reschedules_rate_limited_document(self, mock_vlm, mock_dispatch):
+        """A 429 inside a batch should be retried via process_document after Retry-After."""
+        bad_path = self.bad_doc.file.path
+
+        def fake_vlm(path):
+            if path == bad_path:
+                raise VLMRateLimited("OpenRouter error 429", retry_after=42)
+            return []
+
+        mock_vlm.side_effect = fake_vlm
+
+        process_documents_batch([self.ok_doc.id, self.bad_doc.id])
+
+        mock_dispatch.assert_called_once_with((self.bad_doc.id,), countdown=42, retries=1)
+
+    @patch("coder_app.tasks.call_vlm")
+    def test_batch_noop_for_nonexistent_docs(self, mock_vlm):
+        """process_documents_batch should do nothing when no IDs match."""
+        process_documents_batch([99998, 99999])
+        mock_vlm.assert_not_called()
@@ -3,6 +3,7 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
 
+from .cache import cache_document, get_cached_document
 from .models import MedicalDocument
 from .serializers import DocumentSerializer
 from .tasks import process_document
@@ -35,6 +36,18 @@ class DocumentStatusView(RetrieveAPIView):
     """
     GET /api/documents/<id>/
     Returns current status and VLM results once processing is complete.
+    Completed documents are served from Redis when cached.
     """
     queryset = MedicalDocument.objects.all()
     serializer_class = DocumentSerializer
+
+    def get_object(self):
+        doc = get_cached_document(self.kwargs["pk"])
+        if doc is not None:
+            self.check_object_permissions(self.request, doc)
+            return doc
+
+        doc = super().get_object()
+        if doc.status == MedicalDocument.STATUS_COMPLETED:
+            cache_document(doc)  # completed documents don't change
+        return doc
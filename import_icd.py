@@ -14,6 +14,7 @@ from coder_app.models import ICD10Code
 # Config
 # --------------------------------------------------
 EXCEL_PATH = "coder_app/data/icd10.xlsx"
+BATCH_SIZE = 5000
 
 # --------------------------------------------------
 # Helpers
@@ -46,47 +47,55 @@ print("Columns detected:", list(df.columns))
 
 
 # --------------------------------------------------
-# Import loop
+# Build rows
 # --------------------------------------------------
-created = 0
-updated = 0
 skipped = 0
+objs = {}  # keyed by code: Postgres rejects duplicate keys in one upsert
 
-for idx, row in df.iterrows():
-    code = clean(row.get("ICD10_Code"))
+for row in df.itertuples(index=False):
+    code = clean(row.ICD10_Code)
 
     # Skip rows without a valid ICD code
     if not code:
         skipped += 1
         continue
 
-    obj, is_created = ICD10Code.objects.update_or_create(
+    objs[code] = ICD10Code(
         code=code,
-        defaults={
-            "description": clean(row.get("WHO_Full_Desc")),
-            "chapter": clean(row.get("Chapter_No")),
-            "chapter_desc": clean(row.get("Chapter_Desc")),
-            "group_code": clean(row.get("Group_Code")),
-            "group_desc": clean(row.get("Group_Desc")),
-            "category_3": clean(row.get("ICD10_3_Code")),
-        }
+        description=clean(row.WHO_Full_Desc),
+        chapter=clean(row.Chapter_No),
+        chapter_desc=clean(row.Chapter_Desc),
+        group_code=clean(row.Group_Code),
+        group_desc=clean(row.Group_Desc),
+        category_3=clean(row.ICD10_3_Code),
     )
 
-    if is_created:
-        created += 1
-    else:
-        updated += 1
-
-    # Optional progress log every 5000 rows
-    if (idx + 1) % 5000 == 0:
-        print(f"Processed {idx + 1} rows...")
+# --------------------------------------------------
+# Bulk upsert
+# --------------------------------------------------
+objs = list(objs.values())
+
+for start in range(0, len(objs), BATCH_SIZE):
+    ICD10Code.objects.bulk_create(
+        objs[start:start + BATCH_SIZE],
+        update_conflicts=True,
+        unique_fields=["code"],
+        update_fields=[
+            "description",
+            "chapter",
+            "chapter_desc",
+            "group_code",
+            "group_desc",
+            "category_3",
+        ],
+    )
+    print(f"Upserted {min(start + BATCH_SIZE, len(objs))} rows...")
 
 # --------------------------------------------------
 # Summary
 # --------------------------------------------------
 print("======================================")
 print("ICD-10 import completed successfully")
-print(f"Created : {created}")
-print(f"Updated : {updated}")
+print(f"Upserted: {len(objs)}")
 print(f"Skipped : {skipped}")
 print("======================================")